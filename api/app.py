@@ -1,9 +1,16 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
 import os
+import asyncio
 import numpy as np
+import pyarrow.parquet as pq
+from functools import lru_cache
+from scipy.special import expit
+
+from indicators import BUY, HOLD, KERNEL_MIN_ROWS, SELL, SIGNAL_LABELS
 
 # If you have these modules
 # from indicators.calculate_indicators import process_all_crypto_files
@@ -22,9 +29,13 @@ app.add_middleware(
 
 # Paths
 PROCESSED_FILE = "data/processed/crypto_tech_indicators_11.csv"
-SIGNALS_FILE = "data/processed/crypto_trade_signals_d.csv"
+SIGNALS_FILE = "data/processed/crypto_trade_signals_d.parquet"
 TIMEFRAME = "1d"
 
+# Columns each endpoint actually needs, so loads skip the rest
+SIGNAL_INPUT_COLUMNS = ["Date", "Ticker", "Close", "EMA_20", "MACD", "RSI_14", "Vol_Ratio", "ATR"]
+SIGNAL_COLUMNS = ["Ticker", "Coin_Name", "Live_Price", "Confidence", "Signal", "SL", "TP", "Symbol"]
+
 # Ticker full names
 TICKER_NAMES = {
     "BTC": "Bitcoin",
@@ -59,56 +70,111 @@ eps = 1e-9
 # -------------------------
 # Helpers
 # -------------------------
-def sigmoid(x):
-    return 1 / (1 + np.exp(-x))
-
-def clamp01(x):
-    return float(np.minimum(np.maximum(x, 0.0), 1.0))
-
-def safe_val(row, key, default=np.nan):
-    return float(row.get(key, default) or default)
-
-def compute_confidence(row):
-    close = safe_val(row, "Close")
-    ema20 = safe_val(row, "EMA_20")
-    macd = safe_val(row, "MACD", 0.0)
-    rsi = safe_val(row, "RSI_14", 50.0)
-    vol_ratio = safe_val(row, "Vol_Ratio", 1.0)
-
-    if np.isnan(close) or np.isnan(ema20):
-        trend_score = 0.5
-    else:
-        rel = (close - ema20) / (ema20 + eps)
-        trend_score = sigmoid(rel * 8.0)
-        trend_score = clamp01(trend_score)
-
-    macd_score = sigmoid(macd / (abs(close) * 0.0005 + eps))
-    macd_score = clamp01(macd_score)
-
-    rsi_score = 1.0 - (abs(rsi - 50.0) / 60.0)
-    rsi_score = clamp01(rsi_score)
-
-    vol_score = sigmoid(vol_ratio)
-    vol_score = clamp01(vol_score)
+def safe_col(df, key, default=np.nan):
+    # Missing columns and zero values fall back to default (same as `value or default`)
+    if key not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    x = pd.to_numeric(df[key], errors="coerce").to_numpy(dtype=float)
+    return np.where(x == 0, default, x)
+
+def compute_confidence(df):
+    close = safe_col(df, "Close")
+    ema20 = safe_col(df, "EMA_20")
+    macd = safe_col(df, "MACD", 0.0)
+    rsi = safe_col(df, "RSI_14", 50.0)
+    vol_ratio = safe_col(df, "Vol_Ratio", 1.0)
+
+    # Only evaluate expit where the trend inputs exist; the rest stay neutral
+    valid = ~(np.isnan(close) | np.isnan(ema20))
+    rel = (close[valid] - ema20[valid]) / (ema20[valid] + eps)
+    trend_score = np.full_like(close, 0.5)
+    trend_score[valid] = expit(rel * 8.0)
+
+    # expit already lands in [0, 1]; only the RSI score needs clipping
+    macd_score = expit(macd / (np.abs(close) * 0.0005 + eps))
+    rsi_score = np.clip(1.0 - (np.abs(rsi - 50.0) / 60.0), 0.0, 1.0)
+    vol_score = expit(vol_ratio)
 
     w_trend, w_macd, w_rsi, w_vol = 0.45, 0.25, 0.20, 0.10
     conf = w_trend * trend_score + w_macd * macd_score + w_rsi * rsi_score + w_vol * vol_score
     conf = 0.50 + 0.50 * conf
-    return clamp01(conf)
-
-def decide_signal(row):
-    close = row.get("Close", np.nan)
-    ema20 = row.get("EMA_20", np.nan)
-    macd = row.get("MACD", np.nan)
-    rsi = row.get("RSI_14", np.nan)
-
-    if pd.isna(close) or pd.isna(ema20) or pd.isna(macd) or pd.isna(rsi):
-        return "Hold"
-    if (close > ema20) and (macd > 0) and (rsi < 70):
-        return "Buy"
-    if (close < ema20) and (macd < 0) and (rsi > 30):
-        return "Sell"
-    return "Hold"
+    return np.clip(conf, 0.0, 1.0, out=conf)
+
+def decision_inputs(df):
+    # decide_signal compares the raw values (zeros kept), NaN for missing columns
+    cols = ["Close", "EMA_20", "MACD", "RSI_14"]
+    return df.reindex(columns=cols).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float).T
+
+def decide_signal(df):
+    close, ema20, macd, rsi = decision_inputs(df)
+
+    # NaN comparisons are always False, so rows with missing inputs fall through to Hold
+    buy = (close > ema20) & (macd > 0) & (rsi < 70)
+    sell = (close < ema20) & (macd < 0) & (rsi > 30)
+    return np.where(buy, BUY, np.where(sell, SELL, HOLD)).astype(np.int8)
+
+def compute_levels(df):
+    close = safe_col(df, "Close")
+    atr = safe_col(df, "ATR", np.nan)
+
+    if len(df) >= KERNEL_MIN_ROWS:
+        # Imported lazily so numba only loads (and compiles) once a batch is big enough
+        from indicators._kernels import compute_signals_kernel
+        confidence, signal_code, sl, tp = compute_signals_kernel(
+            close, safe_col(df, "EMA_20"), safe_col(df, "MACD", 0.0),
+            safe_col(df, "RSI_14", 50.0), safe_col(df, "Vol_Ratio", 1.0), atr,
+            *decision_inputs(df)
+        )
+        return close, confidence, signal_code, sl, tp
+
+    confidence = compute_confidence(df)
+    signal_code = decide_signal(df)
+    atr_val = np.where(np.isnan(atr), np.maximum(np.abs(close) * 0.01, eps), atr)
+
+    buy, sell = signal_code == BUY, signal_code == SELL
+    sl = np.where(buy, close - 2 * atr_val, np.where(sell, close + 2 * atr_val, close - atr_val))
+    tp = np.where(buy, close + 3 * atr_val, np.where(sell, close - 3 * atr_val, close + atr_val))
+    return close, confidence, signal_code, sl, tp
+
+def read_csv_fast(path, columns=None):
+    # pyarrow's reader is multithreaded; it needs an explicit usecols list, and Date
+    # is kept as the raw string so JSON output stays "YYYY-MM-DD"
+    usecols = [c for c in pd.read_csv(path, nrows=0).columns if c in columns] if columns else None
+    return pd.read_csv(path, usecols=usecols, engine="pyarrow", dtype={"Date": str, "Ticker": "category"})
+
+def downcast_floats(df):
+    # float32 halves the cached frame, but large prices/volumes lose cents in float32,
+    # so only downcast columns whose 2-decimal values (what the API returns) survive it.
+    # Signal inputs stay float64 so Close/EMA_20/MACD/... are compared at the same precision.
+    for col in df.select_dtypes("float64").columns.difference(SIGNAL_INPUT_COLUMNS):
+        f32 = df[col].astype("float32")
+        if f32.astype("float64").round(2).equals(df[col].round(2)):
+            df[col] = f32
+
+@lru_cache(maxsize=8)
+def _load(path, mtime, columns=None):
+    # mtime is part of the cache key, so a rewritten file is re-read on the next request.
+    # Callers must .copy() before mutating the returned frame.
+    if path.endswith(".parquet"):
+        # Signals files written before a column was added just come back without it
+        df = pd.read_parquet(path, columns=[c for c in pq.read_schema(path).names if c in columns] if columns else None)
+    else:
+        df = read_csv_fast(path, columns)
+    # Normalize tickers once here. Ticker and Symbol are categoricals (~25 distinct values),
+    # so these maps only run over the categories (blank tickers stay NaN)
+    df["Ticker"] = df["Ticker"].astype("category").map(lambda t: t.strip().upper(), na_action="ignore").astype("category")
+    # The signals file stores Symbol/Coin_Name; the processed file gets them once per load
+    if "Symbol" not in df.columns:
+        df["Symbol"] = df["Ticker"].map(lambda t: t.split("-")[0], na_action="ignore")
+    df["Symbol"] = df["Symbol"].astype("category")
+    if "Coin_Name" not in df.columns:
+        df["Coin_Name"] = df["Symbol"].map(lambda s: TICKER_NAMES.get(s, s), na_action="ignore")
+    downcast_floats(df)
+    # Index by Symbol once so per-ticker endpoints are an index lookup, not a full scan
+    return df.set_index("Symbol").sort_index(kind="stable")
+
+def load_file(path, columns=None):
+    return _load(path, os.path.getmtime(path), tuple(columns) if columns else None)
 
 # -------------------------
 # Routes
@@ -129,87 +195,81 @@ def api_calculate_indicators():
     # Placeholder: replace with your actual indicator processing function
     if not os.path.exists(PROCESSED_FILE):
         return {"status": "failed", "detail": "Processed file not found. Implement process_all_crypto_files first."}
-    df = pd.read_csv(PROCESSED_FILE)
+    df = load_file(PROCESSED_FILE, columns=["Ticker"])
     return {"status": "success", "rows": len(df), "file": PROCESSED_FILE}
 
+def _compute_signals_impl():
+    # Undated rows can't be ordered, and idxmax raises on a ticker with no dates at all;
+    # a ticker whose newest candle has no Close falls back to its latest priced one
+    df = load_file(PROCESSED_FILE, columns=SIGNAL_INPUT_COLUMNS).reset_index().dropna(subset=["Date", "Close"])
+    # Latest row per ticker straight from idxmax, no full sort needed
+    last_rows = df.loc[df.groupby("Ticker", sort=False, observed=True)["Date"].idxmax()].reset_index(drop=True)
+    close, confidence, signal_code, sl, tp = compute_levels(last_rows)
+
+    out = pd.DataFrame({
+        "Ticker": last_rows["Ticker"],
+        "Coin_Name": last_rows["Coin_Name"],
+        "Live_Price": np.round(close, 2),
+        "Confidence": np.round(confidence, 2),
+        "Signal": SIGNAL_LABELS[signal_code],
+        "SL": np.round(sl, 2),
+        "TP": np.round(tp, 2),
+        "Symbol": last_rows["Symbol"]
+    })
+
+    os.makedirs(os.path.dirname(SIGNALS_FILE), exist_ok=True)
+    out.to_parquet(SIGNALS_FILE, index=False, compression="zstd")
+
+    return {"status": "success", "tickers": len(out), "file": SIGNALS_FILE}
+
+# Last /compute-signals result and the PROCESSED_FILE mtime it was computed from
+_signals_lock = asyncio.Lock()
+_signals_result = {}
+
 @app.post("/compute-signals", tags=["Signals"])
-def api_compute_signals():
+async def api_compute_signals():
     if not os.path.exists(PROCESSED_FILE):
         raise HTTPException(status_code=404, detail="Indicators file not found. Run /calculate-indicators first.")
 
-    df = pd.read_csv(PROCESSED_FILE).sort_values(["Ticker", "Date"])
-    last_rows = df.groupby("Ticker").last().reset_index()
-    out_rows = []
-
-    for _, r in last_rows.iterrows():
-        ticker = r["Ticker"].strip()
-        close = safe_val(r, "Close")
-        confidence = compute_confidence(r)
-        signal = decide_signal(r)
-        atr = safe_val(r, "ATR", np.nan)
-        atr_val = max(abs(close) * 0.01, eps) if pd.isna(atr) or atr == 0 else atr
-
-        if signal == "Buy":
-            sl = close - 2 * atr_val
-            tp = close + 3 * atr_val
-        elif signal == "Sell":
-            sl = close + 2 * atr_val
-            tp = close - 3 * atr_val
-        else:  # Hold
-            sl = close - atr_val
-            tp = close + atr_val
-
-        symbol = ticker.split("-")[0].upper()
-        out_rows.append({
-            "Ticker": ticker,
-            "Coin_Name": TICKER_NAMES.get(symbol, symbol),
-            "Live_Price": round(close, 2),
-            "Confidence": round(confidence, 2),
-            "Signal": signal,
-            "SL": round(sl, 2),
-            "TP": round(tp, 2)
-        })
-
-    os.makedirs(os.path.dirname(SIGNALS_FILE), exist_ok=True)
-    pd.DataFrame(out_rows).to_csv(SIGNALS_FILE, index=False)
-
-    return {"status": "success", "tickers": len(out_rows), "file": SIGNALS_FILE}
+    mtime = os.path.getmtime(PROCESSED_FILE)
+    async with _signals_lock:
+        # Concurrent callers queue here and reuse the result if the input hasn't changed
+        if _signals_result.get("mtime") != mtime or not os.path.exists(SIGNALS_FILE):
+            result = await run_in_threadpool(_compute_signals_impl)
+            _signals_result.update(mtime=mtime, result=result)
+        return _signals_result["result"]
 
 @app.get("/indicators/{ticker}", tags=["Indicators"])
 def get_indicators(ticker: str):
     if not os.path.exists(PROCESSED_FILE):
         raise HTTPException(status_code=404, detail="Indicators file not found. Run /calculate-indicators first.")
 
-    df = pd.read_csv(PROCESSED_FILE)
-    df["Symbol"] = df["Ticker"].astype(str).str.split("-").str[0].str.upper()
-    df["Coin_Name"] = df["Symbol"].map(TICKER_NAMES)
+    df = load_file(PROCESSED_FILE)
     ticker = ticker.strip().upper()
-    df = df[df["Symbol"] == ticker]
-
-    if df.empty:
+    if ticker not in df.index:
         raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
 
+    df = df.loc[[ticker]].copy()
+    float_cols = df.select_dtypes("float").columns
+    df[float_cols] = df[float_cols].astype("float64")
     numeric_cols = df.select_dtypes(include=["float", "int"]).columns
     df[numeric_cols] = df[numeric_cols].round(2)
-    return df.drop(columns=["Symbol"]).to_dict(orient="records")
+    return df.to_dict(orient="records")
 
 @app.get("/signal/{ticker}", tags=["Signals"])
 def get_signal(ticker: str):
     if not os.path.exists(SIGNALS_FILE):
         raise HTTPException(status_code=404, detail="Signals file not found. Run /compute-signals first.")
 
-    df = pd.read_csv(SIGNALS_FILE)
-    df["Symbol"] = df["Ticker"].astype(str).str.split("-").str[0].str.upper()
-    df["Coin_Name"] = df["Symbol"].map(TICKER_NAMES)
+    df = load_file(SIGNALS_FILE, columns=SIGNAL_COLUMNS)
     ticker = ticker.strip().upper()
-    df = df[df["Symbol"] == ticker]
-
-    if df.empty:
+    if ticker not in df.index:
         raise HTTPException(status_code=404, detail=f"No signal found for {ticker}")
 
+    df = df.loc[[ticker]].copy()
     numeric_cols = ["Live_Price", "Confidence", "SL", "TP"]
     for col in numeric_cols:
         if col in df.columns:
-            df[col] = df[col].apply(lambda x: round(x, 2) if pd.notnull(x) else None)
+            df[col] = df[col].astype("float64").apply(lambda x: round(x, 2) if pd.notnull(x) else None)
 
-    return df.drop(columns=["Symbol"]).to_dict(orient="records")
+    return df.to_dict(orient="records")
@@ -1,8 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
 import os
+import asyncio
 import numpy as np
+from functools import lru_cache
+from scipy.special import expit
+
+from indicators import BUY, HOLD, KERNEL_MIN_ROWS, SELL, SIGNAL_LABELS
 
 app = FastAPI(title="Commodities Indicators & Signals API")
 
@@ -17,9 +23,13 @@ app.add_middleware(
 
 # Paths
 COM_PROCESSED_FILE = "data/processed/commodities_tech_indicators.csv"
-COM_SIGNALS_FILE = "data/processed/commodities_trade_signals.csv"
+COM_SIGNALS_FILE = "data/processed/commodities_trade_signals.parquet"
 eps = 1e-9
 
+# Only load the columns an endpoint needs
+SIGNAL_INPUT_COLUMNS = ["Date", "Ticker", "Close", "EMA_20", "MACD", "RSI_14", "ATR", "Vol_Ratio"]
+SIGNAL_COLUMNS = ["Ticker", "Name", "Live_Price", "Confidence", "Signal", "SL", "TP"]
+
 # Commodity names (must match CSV tickers)
 COMMODITY_NAMES = {
     "BZF": "Brent Futures",
@@ -32,62 +42,103 @@ COMMODITY_NAMES = {
 }
 
 # ----------------- Helpers -----------------
-def sigmoid(x): return 1 / (1 + np.exp(-x))
-def clamp01(x): return float(np.clip(x, 0.0, 1.0))
-def safe_val(row, key, default=np.nan): return float(row.get(key, default) or default)
-
-def compute_confidence(row):
-    close = safe_val(row, "Close")
-    ema20 = safe_val(row, "EMA_20")
-    macd = safe_val(row, "MACD", 0.0)
-    rsi = safe_val(row, "RSI_14", 50.0)
-    vol_ratio = safe_val(row, "Vol_Ratio", 1.0)
-
-    trend_score = 0.5 if np.isnan(close) or np.isnan(ema20) else clamp01(sigmoid((close - ema20) / (ema20 + eps) * 8))
-    macd_score = clamp01(sigmoid(macd / (abs(close)*0.0005 + eps)))
-    rsi_score = clamp01(1.0 - abs(rsi - 50)/60.0)
-    vol_score = clamp01(sigmoid(vol_ratio))
-
-    conf = 0.45*trend_score + 0.25*macd_score + 0.2*rsi_score + 0.1*vol_score
-    return clamp01(0.5 + 0.5*conf)
-
-def decide_signal(row):
-    close, ema20, macd, rsi = safe_val(row, "Close"), safe_val(row, "EMA_20"), safe_val(row, "MACD"), safe_val(row, "RSI_14")
-    if pd.isna(close) or pd.isna(ema20) or pd.isna(macd) or pd.isna(rsi): return "Hold"
-    if (close > ema20) and (macd > 0) and (rsi < 70): return "Buy"
-    if (close < ema20) and (macd < 0) and (rsi > 30): return "Sell"
-    return "Hold"
+def safe_col(df, key, default=np.nan):
+    if key not in df.columns: return np.full(len(df), default, dtype=float)
+    x = pd.to_numeric(df[key], errors="coerce").to_numpy(dtype=float)
+    return np.where(x == 0, default, x)  # same as `value or default`
+
+def compute_confidence(df):
+    close = safe_col(df, "Close")
+    ema20 = safe_col(df, "EMA_20")
+    macd = safe_col(df, "MACD", 0.0)
+    rsi = safe_col(df, "RSI_14", 50.0)
+    vol_ratio = safe_col(df, "Vol_Ratio", 1.0)
+
+    valid = ~(np.isnan(close) | np.isnan(ema20))  # skip expit on rows without trend inputs
+    trend_score = np.full_like(close, 0.5)
+    trend_score[valid] = expit((close[valid] - ema20[valid]) / (ema20[valid] + eps) * 8)
+    macd_score = expit(macd / (np.abs(close)*0.0005 + eps))
+    rsi_score = np.clip(1.0 - np.abs(rsi - 50)/60.0, 0.0, 1.0)
+    vol_score = expit(vol_ratio)
+
+    conf = 0.5 + 0.5*(0.45*trend_score + 0.25*macd_score + 0.2*rsi_score + 0.1*vol_score)
+    return np.clip(conf, 0.0, 1.0, out=conf)
+
+def decision_inputs(df):  # zeros count as missing here, like safe_val did
+    return safe_col(df, "Close"), safe_col(df, "EMA_20"), safe_col(df, "MACD"), safe_col(df, "RSI_14")
+
+def decide_signal(df):
+    close, ema20, macd, rsi = decision_inputs(df)
+    # NaN comparisons are False, so rows with missing inputs stay Hold
+    buy = (close > ema20) & (macd > 0) & (rsi < 70)
+    sell = (close < ema20) & (macd < 0) & (rsi > 30)
+    return np.where(buy, BUY, np.where(sell, SELL, HOLD)).astype(np.int8)
+
+def compute_levels(df):
+    close, atr = safe_col(df, "Close"), safe_col(df, "ATR", np.nan)
+    if len(df) >= KERNEL_MIN_ROWS:
+        from indicators._kernels import compute_signals_kernel  # lazy: numba only loads for big batches
+        conf, code, sl, tp = compute_signals_kernel(close, safe_col(df, "EMA_20"), safe_col(df, "MACD", 0.0),
+                                                    safe_col(df, "RSI_14", 50.0), safe_col(df, "Vol_Ratio", 1.0), atr,
+                                                    *decision_inputs(df))
+        return close, conf, code, sl, tp
+
+    atr_val = np.where(np.isnan(atr), np.maximum(np.abs(close)*0.01, eps), atr)
+    signal_code = decide_signal(df)
+    buy, sell = signal_code==BUY, signal_code==SELL
+    sl = np.where(buy, close - 2*atr_val, np.where(sell, close + 2*atr_val, close - atr_val))
+    tp = np.where(buy, close + 3*atr_val, np.where(sell, close - 3*atr_val, close + atr_val))
+    return close, compute_confidence(df), signal_code, sl, tp
+
+def latest_per_ticker(df):
+    df = df.dropna(subset=["Date"])  # undated rows can't be ordered; idxmax raises on an all-NaN group
+    # date-ordered (appended) files: each ticker's last row is its latest, one O(N) pass
+    if df["Date"].is_monotonic_increasing: return df.drop_duplicates("Ticker", keep="last")
+    return df.loc[df.groupby("Ticker", sort=False, observed=True)["Date"].idxmax()]
 
 def generate_signals(df, name_map):
     df = df.dropna(subset=["Ticker", "Close"], how="any")
-    df["Ticker"] = df["Ticker"].astype(str).str.strip().str.upper()
     numeric_cols = ["Close", "EMA_20", "MACD", "RSI_14", "ATR", "Vol_Ratio"]
     for col in numeric_cols:
         if col in df.columns: df[col] = pd.to_numeric(df[col], errors='coerce')
-    df = df.sort_values(["Ticker", "Date"])
-    latest = df.groupby("Ticker").last().reset_index()
-
-    rows = []
-    for _, r in latest.iterrows():
-        close = safe_val(r, "Close")
-        atr = safe_val(r, "ATR", np.nan)
-        atr_val = max(abs(close)*0.01, eps) if pd.isna(atr) or atr==0 else atr
-        signal = decide_signal(r)
-
-        if signal=="Buy": sl, tp = close - 2*atr_val, close + 3*atr_val
-        elif signal=="Sell": sl, tp = close + 2*atr_val, close - 3*atr_val
-        else: sl, tp = close - atr_val, close + atr_val
-
-        rows.append({
-            "Ticker": r["Ticker"],
-            "Name": name_map.get(r["Ticker"], r["Ticker"]),
-            "Live_Price": round(close,2),
-            "Confidence": round(compute_confidence(r),2),
-            "Signal": signal,
-            "SL": round(sl,2),
-            "TP": round(tp,2)
-        })
-    return pd.DataFrame(rows)
+    latest = latest_per_ticker(df).reset_index(drop=True)
+
+    close, confidence, signal_code, sl, tp = compute_levels(latest)
+    tickers = latest["Ticker"].astype(str)
+
+    return pd.DataFrame({
+        "Ticker": latest["Ticker"],
+        "Name": tickers.map(name_map).fillna(tickers),
+        "Live_Price": np.round(close,2),
+        "Confidence": np.round(confidence,2),
+        "Signal": SIGNAL_LABELS[signal_code],
+        "SL": np.round(sl,2),
+        "TP": np.round(tp,2)
+    })
+
+def read_csv_fast(path, columns=None):
+    # multithreaded pyarrow reader (already required for Parquet); it only takes a usecols list, and Date stays a string
+    usecols = [c for c in pd.read_csv(path, nrows=0).columns if c in columns] if columns else None
+    return pd.read_csv(path, usecols=usecols, engine="pyarrow", dtype={"Date": str, "Ticker": "category"})
+
+def downcast_floats(df):
+    # float32 only where the 2-decimal values the API returns are unchanged (big prices/volumes stay float64);
+    # signal inputs always stay float64 so they are compared at one precision
+    for col in df.select_dtypes("float64").columns.difference(SIGNAL_INPUT_COLUMNS):
+        f32 = df[col].astype("float32")
+        if f32.astype("float64").round(2).equals(df[col].round(2)): df[col] = f32
+
+@lru_cache(maxsize=8)
+def _load(path, mtime, columns=None):
+    # keyed on mtime so rewritten files are re-read; callers copy before mutating
+    df = pd.read_parquet(path, columns=list(columns) if columns else None) if path.endswith(".parquet") else read_csv_fast(path, columns)
+    # normalize tickers once, mapping only the categories; equality filters then compare int codes
+    df["Ticker"] = df["Ticker"].astype("category").map(lambda t: t.strip().upper(), na_action="ignore").astype("category")
+    downcast_floats(df)
+    return df
+
+def upcast(df): return df.astype({c: "float64" for c in df.select_dtypes("float32").columns})
+def load_file(path, columns=None): return _load(path, os.path.getmtime(path), tuple(columns) if columns else None)
 
 # ----------------- Routes -----------------
 @app.get("/", tags=["Root"])
@@ -98,39 +149,48 @@ def root():
 def calculate_commodities_indicators():
     if not os.path.exists(COM_PROCESSED_FILE):
         raise HTTPException(404, "Commodity indicators file not found")
-    df = pd.read_csv(COM_PROCESSED_FILE)
+    df = load_file(COM_PROCESSED_FILE, columns=["Ticker"])
     return {"status":"success","rows":len(df)}
 
-@app.post("/commodities/compute-signals", tags=["Signals"])
-def compute_commodities_signals():
-    if not os.path.exists(COM_PROCESSED_FILE):
-        raise HTTPException(404,"Commodity indicators missing")
-    df = pd.read_csv(COM_PROCESSED_FILE)
+def _compute_signals_impl():
+    df = load_file(COM_PROCESSED_FILE, columns=SIGNAL_INPUT_COLUMNS)
     out = generate_signals(df, COMMODITY_NAMES)
     os.makedirs(os.path.dirname(COM_SIGNALS_FILE), exist_ok=True)
-    out.to_csv(COM_SIGNALS_FILE,index=False)
+    out.to_parquet(COM_SIGNALS_FILE,index=False,compression="zstd")
     return {"status":"success","rows":len(out)}
 
+# last compute result + the input mtime it came from, shared by concurrent callers
+_signals_lock = asyncio.Lock()
+_signals_result = {}
+
+@app.post("/commodities/compute-signals", tags=["Signals"])
+async def compute_commodities_signals():
+    if not os.path.exists(COM_PROCESSED_FILE):
+        raise HTTPException(404,"Commodity indicators missing")
+    mtime = os.path.getmtime(COM_PROCESSED_FILE)
+    async with _signals_lock:
+        if _signals_result.get("mtime") != mtime or not os.path.exists(COM_SIGNALS_FILE):
+            _signals_result.update(mtime=mtime, result=await run_in_threadpool(_compute_signals_impl))
+        return _signals_result["result"]
+
 @app.get("/commodities/indicators/{ticker}", tags=["Indicators"])
 def get_commodity_indicators(ticker:str):
     if not os.path.exists(COM_PROCESSED_FILE):
         raise HTTPException(404,"Commodity indicators file missing")
-    df = pd.read_csv(COM_PROCESSED_FILE)
+    df = load_file(COM_PROCESSED_FILE)
     ticker = ticker.strip().upper()
-    df["Ticker"] = df["Ticker"].astype(str).str.upper()
     df = df[df["Ticker"]==ticker]
     if df.empty:
         raise HTTPException(404,f"No data found for {ticker}")
-    return df.round(2).to_dict("records")
+    return upcast(df).round(2).to_dict("records")
 
 @app.get("/commodities/signal/{ticker}", tags=["Signals"])
 def get_commodity_signal(ticker:str):
     if not os.path.exists(COM_SIGNALS_FILE):
         raise HTTPException(404,"Run /commodities/compute-signals first")
-    df = pd.read_csv(COM_SIGNALS_FILE)
+    df = load_file(COM_SIGNALS_FILE, columns=SIGNAL_COLUMNS)
     ticker = ticker.strip().upper()
-    df["Ticker"] = df["Ticker"].astype(str).str.upper()
     df = df[df["Ticker"]==ticker]
     if df.empty:
         raise HTTPException(404,f"No signal found for {ticker}")
-    return df.to_dict("records")
+    return upcast(df).round(2).to_dict("records")
@@ -0,0 +1,8 @@
+import numpy as np
+
+# Signal codes shared by decide_signal and the numba kernel; index SIGNAL_LABELS with them
+HOLD, BUY, SELL = 0, 1, 2
+SIGNAL_LABELS = np.array(["Hold", "Buy", "Sell"])
+
+# Below this many rows the NumPy path is faster than dispatching to the kernel
+KERNEL_MIN_ROWS = 10_000
@@ -0,0 +1,57 @@
+import numpy as np
+from numba import njit, prange
+
+from indicators import BUY, HOLD, SELL
+
+eps = 1e-9
+
+# All fastmath flags except nnan/ninf: the kernel relies on NaN checks for missing inputs
+FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+@njit(cache=True, fastmath=FASTMATH, parallel=True)
+def compute_signals_kernel(close, ema20, macd, rsi, vol, atr, sig_close, sig_ema20, sig_macd, sig_rsi):
+    # Confidence/SL/TP inputs use the safe_col defaults: NaN for missing Close/EMA_20/ATR,
+    # 0.0 for MACD, 50.0 for RSI_14 and 1.0 for Vol_Ratio. The sig_* arrays are whatever
+    # the caller's decide_signal compares, so both paths pick the same signal.
+    n = close.shape[0]
+    confidence = np.empty(n)
+    signal_code = np.empty(n, dtype=np.int8)
+    sl = np.empty(n)
+    tp = np.empty(n)
+
+    for i in prange(n):
+        c, e, m, r = close[i], ema20[i], macd[i], rsi[i]
+
+        if np.isnan(c) or np.isnan(e):
+            trend_score = 0.5
+        else:
+            trend_score = 1.0 / (1.0 + np.exp(-(c - e) / (e + eps) * 8.0))
+        macd_score = 1.0 / (1.0 + np.exp(-m / (abs(c) * 0.0005 + eps)))
+        rsi_score = min(max(1.0 - abs(r - 50.0) / 60.0, 0.0), 1.0)
+        vol_score = 1.0 / (1.0 + np.exp(-vol[i]))
+
+        conf = 0.45 * trend_score + 0.25 * macd_score + 0.20 * rsi_score + 0.10 * vol_score
+        confidence[i] = min(max(0.50 + 0.50 * conf, 0.0), 1.0)
+
+        # NaN comparisons are False, so rows with missing inputs stay Hold
+        sc, se, sm, sr = sig_close[i], sig_ema20[i], sig_macd[i], sig_rsi[i]
+        if sc > se and sm > 0 and sr < 70:
+            code = BUY
+        elif sc < se and sm < 0 and sr > 30:
+            code = SELL
+        else:
+            code = HOLD
+        signal_code[i] = code
+
+        a = atr[i]
+        if np.isnan(a):
+            a = max(abs(c) * 0.01, eps)
+        if code == BUY:
+            sl[i], tp[i] = c - 2 * a, c + 3 * a
+        elif code == SELL:
+            sl[i], tp[i] = c + 2 * a, c - 3 * a
+        else:
+            sl[i], tp[i] = c - a, c + a
+
+    return confidence, signal_code, sl, tp
@@ -10,7 +10,7 @@ print("Original ETH columns:", eth_df.columns)
 
 
 # 2. PARSE DATE
-eth_df["date"] = pd.to_datetime(eth_df["date"], errors='coerce')
+eth_df["date"] = pd.to_datetime(eth_df["date"], format="%Y-%m-%d %H:%M:%S", errors='coerce')
 eth_df = eth_df.dropna(subset=["date"])  # keep valid dates only
 
 
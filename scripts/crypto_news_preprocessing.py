@@ -1,6 +1,11 @@
 import pandas as pd
+import numpy as np
+import os
 import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from joblib import Parallel, delayed
 
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import nltk
@@ -11,43 +16,88 @@ nltk.download('vader_lexicon')
 
 # 1. LOAD NEWS DATA
 file_path = r"text\crypto_project\data\raw\investing_news_crypto_data.csv"
-news_df = pd.read_csv(file_path)
+# Read in chunks: memory holds two chunks (the one being scored and the one being read),
+# the per-date totals, and a fixed ~100 bytes per distinct description in the score cache
+CHUNK_SIZE = 50_000
 
-print("Original columns:", news_df.columns)
+def read_chunks(path):
+    # Read the next chunk in a background thread while the current one is scored
+    reader = pd.read_csv(path, chunksize=CHUNK_SIZE)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(next, reader, None)
+        while (chunk := pending.result()) is not None:
+            pending = pool.submit(next, reader, None)
+            yield chunk
 
 
 # 2. CLEAN TEXT
-def clean_text(text):
-    if pd.isna(text):
-        return ""
-    text = re.sub(r"http\S+", "", text)          # remove links
-    text = re.sub(r"[^A-Za-z0-9\s]", " ", text)  # remove special chars
-    text = re.sub(r"\s+", " ", text).strip()     # remove extra spaces
-    return text
-
-news_df["title_clean"] = news_df["title"].astype(str).apply(clean_text)
-news_df["description_clean"] = news_df["description"].astype(str).apply(clean_text)
-
-
-# 3. PARSE DATE
-news_df["date"] = pd.to_datetime(news_df["date"], errors='coerce')
-news_df = news_df.dropna(subset=["date"])  # drop rows where date parsing failed
-
-
-# 4. SENTIMENT SCORE (USING VADER)
-sia = SentimentIntensityAnalyzer()
-
-def get_sentiment(text):
-    return sia.polarity_scores(str(text))["compound"]
-
-news_df["sentiment"] = news_df["description_clean"].apply(get_sentiment)
+URL_RE = re.compile(r"http\S+")                # links
+SPECIAL_RE = re.compile(r"[^A-Za-z0-9\s]")     # special chars
+SPACES_RE = re.compile(r"\s+")                 # extra spaces
+
+def clean_text(texts):
+    return (
+        texts.astype(str)
+        .str.replace(URL_RE, "", regex=True)
+        .str.replace(SPECIAL_RE, " ", regex=True)
+        .str.replace(SPACES_RE, " ", regex=True)
+        .str.strip()
+        .fillna("")
+    )
+
+
+# 3. SENTIMENT SCORE (USING VADER)
+N_JOBS = os.cpu_count() or 1
+scores = {}  # 8-byte digest of the cleaned description -> compound score, shared across chunks
+
+def text_key(text):
+    return hashlib.blake2b(text.encode(), digest_size=8).digest()
+
+def score_batch(texts):
+    # Built inside the worker so each process loads the lexicon once per batch
+    sia = SentimentIntensityAnalyzer()
+    return [sia.polarity_scores(str(text))["compound"] for text in texts]
+
+def score_texts(texts, parallel):
+    # Score each distinct description once; reposts and empty descriptions repeat a lot.
+    # VADER is pure Python, so split the new texts into one batch per core.
+    keys = [text_key(t) for t in texts]
+    new_texts = {}
+    for key, text in zip(keys, texts):
+        if key not in scores: new_texts.setdefault(key, text)
+    batches = [b for b in np.array_split(np.array(list(new_texts.values()), dtype=object), N_JOBS) if len(b)]
+    batch_scores = parallel(delayed(score_batch)(b) for b in batches)
+    scores.update(zip(new_texts, (s for batch in batch_scores for s in batch)))
+    return pd.Series([scores[key] for key in keys], index=texts.index)
+
+
+# 4. PROCESS CHUNKS
+daily_parts = []
+with Parallel(n_jobs=N_JOBS) as parallel:  # keep the worker pool alive across chunks
+    for i, news_df in enumerate(read_chunks(file_path)):
+        if i == 0:
+            print("Original columns:", news_df.columns)
+
+        news_df["title_clean"] = clean_text(news_df["title"])
+        news_df["description_clean"] = clean_text(news_df["description"])
+        # Dates are day-first; an explicit format skips inference, and to_datetime caches
+        # repeated timestamps. Unparseable dates become NaT and are dropped.
+        news_df["date"] = pd.to_datetime(news_df["date"], format="%d-%m-%Y %H:%M", errors="coerce")
+        news_df = news_df.dropna(subset=["date"])
+        news_df["sentiment"] = score_texts(news_df["description_clean"], parallel)
+
+        # Per-date partial totals; the mean is finished once all chunks are in
+        daily_parts.append(news_df.groupby(news_df["date"].dt.date).agg(
+            news_count=("title", "count"),
+            sentiment_sum=("sentiment", "sum"),
+            sentiment_n=("sentiment", "count")
+        ))
 
 
 # 5. AGGREGATE NEWS BY DATE
-daily_news = news_df.groupby(news_df["date"].dt.date).agg(
-    news_count=("title", "count"),
-    mean_sentiment=("sentiment", "mean")
-).reset_index()
+daily_news = pd.concat(daily_parts).groupby(level=0).sum()
+daily_news["mean_sentiment"] = daily_news.pop("sentiment_sum") / daily_news.pop("sentiment_n")
+daily_news = daily_news.rename_axis("date").reset_index()
 
 daily_news.rename(columns={"date": "date"}, inplace=True)
 daily_news["date"] = pd.to_datetime(daily_news["date"])
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+pytest.importorskip("numba")
+
+import api.app as crypto_api  # noqa: E402
+import api.commodities as commodities_api  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def indicators():
+    df = pd.read_csv(os.path.join(ROOT, "data", "processed", "crypto_tech_indicators.csv"))
+    df = pd.concat([df, df], ignore_index=True)
+    # Exercise the edge cases where the two APIs treat zeros and NaNs differently
+    for col, step in [("Close", 97), ("EMA_20", 89), ("MACD", 83), ("RSI_14", 79), ("ATR", 73), ("Vol_Ratio", 71)]:
+        df.loc[::step, col] = 0.0
+    df.loc[5::101, "EMA_20"] = np.nan
+    df.loc[7::103, "MACD"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("module", [crypto_api, commodities_api])
+def test_kernel_matches_numpy_path(module, indicators, monkeypatch):
+    assert len(indicators) >= module.KERNEL_MIN_ROWS
+
+    close, conf, code, sl, tp = module.compute_levels(indicators)
+    np.testing.assert_array_equal(code, module.decide_signal(indicators))
+    np.testing.assert_allclose(conf, module.compute_confidence(indicators), rtol=1e-9, equal_nan=True)
+
+    monkeypatch.setattr(module, "KERNEL_MIN_ROWS", len(indicators) + 1)
+    _, ref_conf, ref_code, ref_sl, ref_tp = module.compute_levels(indicators)
+    np.testing.assert_array_equal(code, ref_code)
+    np.testing.assert_allclose(conf, ref_conf, rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(sl, ref_sl, rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(tp, ref_tp, rtol=1e-9, equal_nan=True)
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import api.app as crypto_api  # noqa: E402
+import api.commodities as commodities_api  # noqa: E402
+
+
+@pytest.fixture
+def indicators(tmp_path):
+    df = pd.read_csv(os.path.join(ROOT, "data", "processed", "crypto_tech_indicators.csv"))
+    # A ticker whose rows have no Date at all, plus an undated row for an existing ticker
+    undated = df[df["Ticker"] == "BTC-USD"].tail(2).assign(Ticker="UNDATED-USD", Date=np.nan)
+    stray = df[df["Ticker"] == "ETH-USD"].head(1).assign(Date=np.nan, Close=1e9)
+    # The newest candle of one ticker is missing its Close
+    df.loc[df[df["Ticker"] == "SOL-USD"]["Date"].idxmax(), "Close"] = np.nan
+    path = tmp_path / "indicators.csv"
+    pd.concat([df, undated, stray]).to_csv(path, index=False)
+    return df, str(path)
+
+
+def expected_prices(df):
+    # What the original sort_values + groupby().last() selection returned for dated rows;
+    # last() skips a NaN Close and takes the previous candle's
+    return df.sort_values("Date").groupby("Ticker")["Close"].last().round(2)
+
+
+def live_prices(out):
+    return out.set_index(out["Ticker"].astype(str))["Live_Price"].sort_index()
+
+
+def test_crypto_signals_use_latest_usable_row(indicators, tmp_path, monkeypatch):
+    df, path = indicators
+    monkeypatch.setattr(crypto_api, "PROCESSED_FILE", path)
+    monkeypatch.setattr(crypto_api, "SIGNALS_FILE", str(tmp_path / "signals.parquet"))
+
+    crypto_api._compute_signals_impl()
+    out = pd.read_parquet(tmp_path / "signals.parquet")
+    pd.testing.assert_series_equal(live_prices(out), expected_prices(df), check_names=False)
+
+
+def test_commodity_signals_use_latest_usable_row(indicators):
+    df, path = indicators
+    out = commodities_api.generate_signals(commodities_api.load_file(path, commodities_api.SIGNAL_INPUT_COLUMNS), {})
+    pd.testing.assert_series_equal(live_prices(out), expected_prices(df), check_names=False)